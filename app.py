@@ -4,8 +4,16 @@
 # ------------------------------------------------------------
 
 import streamlit as st
-import tempfile
-from kpi_compare import extract_kpis
+from concurrent.futures import wait
+import kpi_metrics
+import kpi_pool
+from kpi_compare import extract_kpis_with_triage
+
+# Mätvärden (Prometheus) - startas en gång per process, styrs av KPI_METRICS_*
+kpi_metrics.start_from_env()
+
+# Gemensam arbetspool för alla sessioner (tak: KPI_MAX_CONCURRENCY)
+pool = kpi_pool.get_pool()
 
 # Inject custom CSS for premium styling
 with open(".streamlit/theme.css") as f:
@@ -83,14 +91,31 @@ if st.button("Analysera & visa jämförelse + kundtext"):
         st.error("Ladda upp båda PDF:erna först.")
         st.stop()
 
-    with st.spinner("Läser PDF:er..."):
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as f1, \
-             tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as f2:
-            f1.write(pdf_current.read())
-            f2.write(pdf_new.read())
-
-            k_current = extract_kpis(f1.name)
-            k_new = extract_kpis(f2.name)
+    # UploadedFile ligger redan i minnet - läs direkt ur bufferten.
+    # Jobben köas i den gemensamma poolen så att samtidiga användare
+    # inte trängs om CPU:n; visa köplatsen medan vi väntar.
+    status = st.empty()
+    jobs = [
+        pool.submit(extract_kpis_with_triage, pdf_current.getbuffer()),
+        pool.submit(extract_kpis_with_triage, pdf_new.getbuffer()),
+    ]
+    try:
+        with st.spinner("Läser PDF:er..."):
+            while not all(j.done() for j in jobs):
+                place = next((p for p in (pool.position(j) for j in jobs) if p), 0)
+                if place:
+                    status.info(f"Många analyserar just nu – din plats i kön: {place}")
+                else:
+                    status.empty()
+                wait(jobs, timeout=0.5)
+    finally:
+        # Avbruten körning (ny knapptryckning/stängd flik) - släpp köplatserna
+        for j in jobs:
+            j.cancel()
+    status.empty()
+
+    k_current, skipped_current = jobs[0].result()
+    k_new, skipped_new = jobs[1].result()
 
     st.session_state["rooms_auto"] = safe_raw(k_new, "Antal behandlingsrum")
     st.session_state["location_auto"] = safe_display(k_current, "Försäkringsställe")
@@ -121,6 +146,13 @@ if st.button("Analysera & visa jämförelse + kundtext"):
             st.write(f"**{current_company}:** {c}  (sida {safe_page(k_current, key)})")
             st.write(f"**{new_company}:** {n}  (sida {safe_page(k_new, key)})")
 
+        # Bara när sidtriage är påslagen (KPI_PAGE_TRIAGE=1)
+        if skipped_current or skipped_new:
+            st.subheader("Överhoppade sidor (saknar KPI:er)")
+            for company, skipped in ((current_company, skipped_current), (new_company, skipped_new)):
+                pages = ", ".join(f"s.{s.page} ({s.reason})" for s in skipped) or "inga"
+                st.write(f"**{company}:** {pages}")
+
     with tab_letter:
         new_price = safe_display(k_new, "Premie / Pris")
         current_price = safe_display(k_current, "Premie / Pris")
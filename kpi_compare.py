@@ -6,12 +6,31 @@
 # - Protetik: 2 KPI:er (garantitid + antal tandläkare)
 # - Försäkringsställe: label/sektion först, toppblock sist
 # - Sjukavbrott: finns/ej + (ev) radbevis
+# - Indata: sökväg (memory-mappas), bytes/memoryview eller fil-objekt
+# - Sidtriage (opt-in): bild-/villkorssidor utan KPI-ankare hoppas över
+# - Mätvärden (se kpi_metrics.py)
 # ------------------------------------------------------------
 
+import io
+import mmap
+import os
 import re
+import time
 import pdfplumber
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdfinterp import PDFContentParser, PDFResourceManager
+from pdfminer.pdftypes import PDFObjRef, resolve1
+from pdfminer.psparser import PSEOF, PSKeyword, keyword_name, literal_name
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, List, Tuple, Union, BinaryIO, Iterator
+
+import kpi_metrics as metrics
+
+
+# En PDF kan anges som sökväg, som rå buffert eller som öppet fil-objekt
+# (t.ex. Streamlits UploadedFile).
+PdfSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
 
 
 # -------------------- Data models --------------------
@@ -20,6 +39,8 @@ from typing import Optional, Dict, List, Tuple
 class Evidence:
     page: int
     text: str
+    # True om värdet är ett antaget standardvärde och inte lästes ur PDF:en
+    default: bool = False
 
 @dataclass
 class KPI:
@@ -88,9 +109,254 @@ def to_number(s: str) -> float:
     s = s.replace(" ", "").replace(",", ".")
     return float(s)
 
-def read_pages(path: str) -> List[Tuple[int, str]]:
-    with pdfplumber.open(path) as pdf:
-        return [(i + 1, (p.extract_text() or "")) for i, p in enumerate(pdf.pages)]
+class BufferReader(io.RawIOBase):
+    """
+    Läsbar, sökbar ström direkt ovanpå en buffert (bytearray/memoryview).
+    io.BytesIO kopierar sådana buffertar - här läser vi ur dem på plats.
+    """
+
+    def __init__(self, buf):
+        self._view = memoryview(buf).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"ogiltigt whence: {whence}")
+        if pos < 0:
+            raise ValueError(f"negativ position: {pos}")
+        self._pos = pos
+        return pos
+
+    def readinto(self, b) -> int:
+        with self._view[self._pos:self._pos + len(b)] as chunk:
+            n = len(chunk)
+            b[:n] = chunk
+        self._pos += n
+        return n
+
+    def close(self) -> None:
+        self._view.release()
+        super().close()
+
+@contextmanager
+def open_source(source: PdfSource) -> Iterator[BinaryIO]:
+    """
+    Ger en läsbar ström för pdfplumber utan extra diskskrivning/kopia:
+    - sökväg: filen memory-mappas (read-only)
+    - bytes: io.BytesIO delar bufferten med bytes-objektet
+    - bytearray/memoryview: läses på plats via BufferReader
+    - fil-objekt: används som det är (stängs inte här)
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f, \
+             mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+    elif isinstance(source, bytes):
+        with io.BytesIO(source) as stream:
+            yield stream
+    elif isinstance(source, (bytearray, memoryview)):
+        with BufferReader(source) as stream:
+            yield stream
+    else:
+        # pdfminer söker absolut i strömmen, men börja från start ändå
+        # (t.ex. om anroparen redan har läst en UploadedFile)
+        if source.seekable():
+            source.seek(0)
+        yield source
+
+# -------------------- Page triage --------------------
+
+@dataclass
+class SkippedPage:
+    page: int
+    reason: str
+
+# Triage är opt-in (KPI_PAGE_TRIAGE=1): skanningen kostar ungefär halva
+# extract_text(), så den lönar sig bara för dokument med många sidor utan
+# KPI-ankare. På de medföljande PDF:erna sparar den ingen tid.
+PAGE_TRIAGE = os.environ.get("KPI_PAGE_TRIAGE", "") == "1"
+
+# detect_company läser de första sidorna - de triageras aldrig bort
+TRIAGE_KEEP_FIRST = 2
+
+# Ankare per KPI-regex (se kpi_pattern): ord som alla måste finnas någonstans
+# på sidan för att regexen ska kunna matcha. Ingen ordning krävs - content
+# streamen är i ritordning, extract_text() i läsordning.
+TRIAGE_ANCHORS: List[Tuple[Tuple[str, ...], bool]] = []
+
+def triage_glyphs(text: str) -> str:
+    """
+    Text i den form ankarna jämförs mot: utan blanksteg/radbrytningar.
+    """
+    return "".join(text.split())
+
+def kpi_pattern(pattern: str, anchor: Tuple[str, ...], example: str, flags: int = re.I) -> re.Pattern:
+    """
+    Kompilerar en KPI-regex på sidnivå och registrerar dess triageankare.
+    - anchor: rubrikord (bokstavliga, utan siffror/blanksteg) som regexen
+      kräver, t.ex. ("årspremie", "kr"); skiftlägesokänsliga om regexen är re.I
+    - example: textrad som regexen ska matcha; varje ankarord måste finnas
+      i samma rad - annars fel redan vid import
+    """
+    rx = re.compile(pattern, flags)
+    ignore_case = bool(flags & re.I)
+    if not anchor:
+        raise ValueError(f"{pattern!r} saknar triageankare")
+    for word in anchor:
+        # Värden kan ritas före/efter rubriken - bara rubrikord får vara ankare
+        if not word or any(ch.isdigit() or ch.isspace() for ch in word):
+            raise ValueError(f"ankarord {word!r} för {pattern!r} måste vara rubriktext")
+    if not rx.search(example):
+        raise ValueError(f"exempel {example!r} matchar inte {pattern!r}")
+    glyphs = triage_glyphs(example)
+    words = tuple(w.lower() for w in anchor) if ignore_case else tuple(anchor)
+    if ignore_case:
+        glyphs = glyphs.lower()
+    missing = [w for w in words if w not in glyphs]
+    if missing:
+        raise ValueError(f"ankarord {missing!r} finns inte i exemplet {example!r} för {pattern!r}")
+    TRIAGE_ANCHORS.append((words, ignore_case))
+    return rx
+
+def _load_font(rsrcmgr: PDFResourceManager, spec):
+    objid = spec.objid if isinstance(spec, PDFObjRef) else None
+    spec = resolve1(spec)
+    if not isinstance(spec, dict):
+        return None
+    return rsrcmgr.get_font(objid, spec)
+
+def _has_anchor(glyphs: str) -> bool:
+    lowered = glyphs.lower()
+    for words, ignore_case in TRIAGE_ANCHORS:
+        text = lowered if ignore_case else glyphs
+        if all(w in text for w in words):
+            return True
+    return False
+
+def _scan_content(page) -> Optional[Tuple[str, int]]:
+    """
+    Tokeniserar sidans content stream med pdfminers PDFContentParser - ingen
+    tolkning (grafikstate, teckenpositioner, LTChar-objekt), bara avkodning
+    av strängarna till Tj/TJ/'/" med aktuellt typsnitt.
+    Returnerar (triage_glyphs(text), antal ritade bilder), eller None om sidan
+    inte kan bedömas säkert: Form-XObjects (deras text syns inte här), text
+    utan typsnitt eller tecken som inte går att avkoda.
+    """
+    page_obj = page.page_obj
+    resources = resolve1(page_obj.resources) or {}
+    font_specs = resolve1(resources.get("Font")) or {}
+    xobjects = resolve1(resources.get("XObject")) or {}
+    if not page_obj.contents:
+        return "", 0
+
+    parser = PDFContentParser(page_obj.contents)
+    fonts: Dict[str, object] = {}
+    font = None
+    parts: List[str] = []
+    images = 0
+    operands: List[object] = []
+    while True:
+        try:
+            _, obj = parser.nextobject()
+        except PSEOF:
+            break
+        if not isinstance(obj, PSKeyword):
+            operands.append(obj)
+            continue
+
+        op = keyword_name(obj)
+        if op == "Tf" and len(operands) >= 2:
+            name = literal_name(operands[-2])
+            if name not in fonts:
+                fonts[name] = _load_font(page.pdf.rsrcmgr, font_specs.get(name))
+            font = fonts[name]
+        elif op in ("Tj", "'", '"', "TJ") and operands:
+            strings = operands[-1] if op == "TJ" else [operands[-1]]
+            for raw in strings:
+                if not isinstance(raw, bytes):
+                    continue  # kerning i TJ-arrayer
+                if font is None:
+                    return None
+                for cid in font.decode(raw):
+                    try:
+                        parts.append(font.to_unichr(cid))
+                    except PDFUnicodeNotDefined:
+                        return None
+        elif op == "Do" and operands:
+            xobj = resolve1(xobjects.get(literal_name(operands[-1])))
+            subtype = resolve1(getattr(xobj, "attrs", {}).get("Subtype"))
+            if getattr(subtype, "name", None) != "Image":
+                return None
+            images += 1
+        elif op == "EI":
+            images += 1  # inline-bild (BI ... ID ... EI)
+        operands = []
+    return triage_glyphs("".join(parts)), images
+
+def triage_page(page) -> Optional[str]:
+    """
+    Billig förkontroll av en pdfplumber-sida innan extract_text().
+    Returnerar skälet att hoppa över sidan, eller None om den ska läsas.
+    Vid minsta tvekan (okänd struktur, avkodningsfel) läses sidan.
+    """
+    try:
+        scan = _scan_content(page)
+    except Exception:
+        return None
+    if scan is None:
+        return None
+
+    glyphs, images = scan
+    if not glyphs:
+        return "skannad sida (ingen text)" if images else "tom sida"
+    if _has_anchor(glyphs):
+        return None
+    return "villkors-/informationssida (inga KPI-ankare)"
+
+def read_pages(
+    source: PdfSource,
+    triage: Optional[bool] = None,
+    skipped: Optional[List[SkippedPage]] = None,
+) -> List[Tuple[int, str]]:
+    """
+    Läser text per sida som (sidnummer, text).
+    Med triage (default PAGE_TRIAGE) hoppas sidor som inte kan innehålla
+    någon KPI över; de läggs i `skipped` om en lista skickas in.
+    Sidnumren behålls.
+    """
+    if triage is None:
+        triage = PAGE_TRIAGE
+    start = time.perf_counter()
+    pages: List[Tuple[int, str]] = []
+    with open_source(source) as stream, pdfplumber.open(stream) as pdf:
+        for i, p in enumerate(pdf.pages):
+            reason = triage_page(p) if triage and i >= TRIAGE_KEEP_FIRST else None
+            if reason:
+                metrics.PAGES_SKIPPED.inc(reason=reason)
+                if skipped is not None:
+                    skipped.append(SkippedPage(i + 1, reason))
+            else:
+                pages.append((i + 1, (p.extract_text() or "")))
+    elapsed = time.perf_counter() - start
+
+    metrics.READ_PAGES_SECONDS.observe(elapsed)
+    metrics.PAGES_READ.inc(len(pages))
+    return pages
 
 def first_number_token(line: str) -> Optional[str]:
     """
@@ -156,14 +422,20 @@ def find_first_line(pages, patterns: List[re.Pattern]) -> KPI:
                 )
     return kpi_none()
 
+RX_ROOMS_SVEDEA = kpi_pattern(
+    r"\bBeh\.rum\s+([^\n\r]+)", anchor=("beh.rum",), example="Beh.rum 1-4/kök")
+
 def find_svedea_rooms(pages: List[Tuple[int, str]]) -> KPI:
     """
     Svedea: "Beh.rum 1-4/kök" (textvärde)
     """
-    return find_first_line(
-        pages,
-        [re.compile(r"\bBeh\.rum\s+([^\n\r]+)", re.I)]
-    )
+    return find_first_line(pages, [RX_ROOMS_SVEDEA])
+
+RX_TURNOVER_KSEK_SVEDEA = kpi_pattern(
+    r"Årsomsättning\s+i\s*KSEK.*?\n\s*([0-9\s]+)",
+    anchor=("årsomsättning", "ksek"),
+    example="Årsomsättning i KSEK\n10 000 10 000 0 0 0",
+)
 
 def find_svedea_ksek_turnover(pages: List[Tuple[int, str]]) -> KPI:
     """
@@ -171,7 +443,7 @@ def find_svedea_ksek_turnover(pages: List[Tuple[int, str]]) -> KPI:
     Vi tar första tal-token och normaliserar till SEK (multiplicerar med 1000).
     """
     for page, text in pages:
-        m = re.search(r"Årsomsättning\s+i\s*KSEK.*?\n\s*([0-9\s]+)", text, re.I)
+        m = RX_TURNOVER_KSEK_SVEDEA.search(text)
         if m:
             raw_line = m.group(1).strip()
             first = first_number_token(raw_line)
@@ -189,37 +461,64 @@ def find_svedea_ksek_turnover(pages: List[Tuple[int, str]]) -> KPI:
                 )
     return KPI(None, None, "KSEK", 1000.0, None)
 
+RX_TURNOVER_PTL = kpi_pattern(
+    r"Årsomsättning\s+([\d\s]+)\s*kr", anchor=("årsomsättning", "kr"), example="Årsomsättning 8 232 000 kr")
+
 def find_ptl_turnover_sek(pages: List[Tuple[int, str]]) -> KPI:
     # PTL: "Årsomsättning 8 232 000 kr"
     return find_first(
         pages,
-        [re.compile(r"Årsomsättning\s+([\d\s]+)\s*kr", re.I)],
+        [RX_TURNOVER_PTL],
         unit="kr",
         multiplier=1.0,
     )
 
+RX_PREMIUM_PTL = kpi_pattern(
+    r"Subtotal\s+([\d\s]+)\s*(?:kr)?", anchor=("subtotal",), example="Subtotal 12 345 kr")
+
 def find_premium_ptl(pages: List[Tuple[int, str]]) -> KPI:
     # PTL: "Subtotal" på sida 1 (faktura-totalen)
     first_pages = [p for p in pages if p[0] == 1]
-    return find_first(first_pages, [re.compile(r"Subtotal\s+([\d\s]+)\s*(?:kr)?", re.I)], unit="kr")
+    return find_first(first_pages, [RX_PREMIUM_PTL], unit="kr")
+
+RX_PREMIUM_SVEDEA = kpi_pattern(
+    r"Årspremie\s+([\d\s]+)\s*kr", anchor=("årspremie", "kr"), example="Årspremie 37 240 kr")
 
 def find_premium_svedea(pages: List[Tuple[int, str]]) -> KPI:
     # Svedea: "Årspremie 37 240 kr"
     return find_first(
         pages,
-        [re.compile(r"Årspremie\s+([\d\s]+)\s*kr", re.I)],
+        [RX_PREMIUM_SVEDEA],
         unit="kr",
         multiplier=1.0,
     )
 
+RX_PROTETIK_YEARS_PTL = kpi_pattern(
+    r"\bGrund\s+(\d+)\s*år\b", anchor=("grund", "år"), example="Grund 3 år")
+
 def find_protetik_years_ptl(pages: List[Tuple[int, str]]) -> KPI:
     # PTL: "Grund 3 år"
     return find_first(
         pages,
-        [re.compile(r"\bGrund\s+(\d+)\s*år\b", re.I)],
+        [RX_PROTETIK_YEARS_PTL],
         unit="år",
     )
 
+RX_PROTETIK_YEARS_SVEDEA = [
+    kpi_pattern(
+        r"garantiförsäkring\s+för\s+protetik\s+.*?(\d+)\s*år",
+        anchor=("garantiförsäkring", "protetik", "år"),
+        example="Utökad Garantiförsäkring för protetik 5 år",
+        flags=re.I | re.DOTALL,
+    ),
+    kpi_pattern(
+        r"protetik\s+.*?(\d+)\s*år",
+        anchor=("protetik", "år"),
+        example="Protetik\nGarantitid 5 år",
+        flags=re.I | re.DOTALL,
+    ),
+]
+
 def find_protetik_years_svedea(pages: List[Tuple[int, str]]) -> KPI:
     # Svedea: Försök att hitta garantitiden för protetik i brevet
     # Om den framgår ska den matchas någonstans nära "protetik" eller "garantiförsäkring"
@@ -227,11 +526,7 @@ def find_protetik_years_svedea(pages: List[Tuple[int, str]]) -> KPI:
     
     result = find_first(
         pages,
-        [
-            # Möjliga mönster för explicit garantitid
-            re.compile(r"garantiförsäkring\s+för\s+protetik\s+.*?(\d+)\s*år", re.I | re.DOTALL),
-            re.compile(r"protetik\s+.*?(\d+)\s*år", re.I | re.DOTALL),
-        ],
+        RX_PROTETIK_YEARS_SVEDEA,  # Möjliga mönster för explicit garantitid
         unit="år",
     )
     
@@ -245,18 +540,32 @@ def find_protetik_years_svedea(pages: List[Tuple[int, str]]) -> KPI:
         raw="3",
         unit="år",
         multiplier=1.0,
-        evidence=Evidence(1, "Svedea garantiförsäkring för protetik: 3 år (standard)")
+        evidence=Evidence(1, "Svedea garantiförsäkring för protetik: 3 år (standard)", default=True)
     )
 
+RX_PROTETIK_DENTISTS_SVEDEA = kpi_pattern(
+    r"-\s*Antal\s+tandläkare\s+([\d\s]+,\d+|\d+)",
+    anchor=("antal", "tandläkare"),
+    example="- Antal tandläkare 3,00",
+)
+
 def find_protetik_dentist_count_svedea(pages: List[Tuple[int, str]]) -> KPI:
     # Svedea: "- Antal tandläkare 3,00"
     return find_first(
         pages,
-        [re.compile(r"-\s*Antal\s+tandläkare\s+([\d\s]+,\d+|\d+)", re.I)],
+        [RX_PROTETIK_DENTISTS_SVEDEA],
         unit="st",
         multiplier=1.0
     )
 
+# Namnregexen avgör träff - kandidatregexen nedan styr bara sidordningen
+RX_PROTETIK_DENTIST_NAME_PTL = kpi_pattern(
+    r"\bTandläkare\s+([A-Za-zÅÄÖåäö\-]+(?:\s+[A-Za-zÅÄÖåäö\-]+)+)\b",
+    anchor=("Tandläkare",),
+    example="Tandläkare Lisa Taavo",
+    flags=0,
+)
+
 def find_protetik_dentist_count_ptl(pages: List[Tuple[int, str]]) -> KPI:
     """
     PTL: de listar namn i protetikavsnittet.
@@ -272,7 +581,7 @@ def find_protetik_dentist_count_ptl(pages: List[Tuple[int, str]]) -> KPI:
             candidates.append((page, text))
 
     # regex för tandläkarnamn (2+ ord, tillåter bindestreck)
-    name_rx = re.compile(r"\bTandläkare\s+([A-Za-zÅÄÖåäö\-]+(?:\s+[A-Za-zÅÄÖåäö\-]+)+)\b")
+    name_rx = RX_PROTETIK_DENTIST_NAME_PTL
 
     for page, text in candidates or pages:
         names = set(m.group(1).strip() for m in name_rx.finditer(text))
@@ -289,32 +598,44 @@ def find_protetik_dentist_count_ptl(pages: List[Tuple[int, str]]) -> KPI:
 
     return kpi_none()
 
+RX_LOCATION_PTL = kpi_pattern(
+    r"Försäkringsställen\s+(.+?)(?:\n|$)",
+    anchor=("försäkringsställen",),
+    example="Försäkringsställen Hantverkargatan 1 a, 95234",
+)
+
 def find_location_ptl(pages: List[Tuple[int, str]]) -> KPI:
     # PTL: "Försäkringsställen Hantverkargatan 1 a, 95234" (från Försäkringsbesked)
-    return find_first_line(
-        pages,
-        [re.compile(r"Försäkringsställen\s+(.+?)(?:\n|$)", re.I)]
-    )
+    return find_first_line(pages, [RX_LOCATION_PTL])
+
+RX_LOCATION_SVEDEA = kpi_pattern(
+    r"EGENDOMSFÖRSÄKRING\s+SJÄLVRISK\s+([^\n]+,[^\n]+\d)",
+    anchor=("egendomsförsäkring", "självrisk"),
+    example="EGENDOMSFÖRSÄKRING SJÄLVRISK\nNorrköping, Drottninggatan 64",
+)
 
 def find_location_svedea(pages: List[Tuple[int, str]]) -> KPI:
     # Svedea: "Norrköping, Drottninggatan 64" direkt under EGENDOMSFÖRSÄKRING/SJÄLVRISK rubriken
     for page, text in pages:
-        m = re.search(r"EGENDOMSFÖRSÄKRING\s+SJÄLVRISK\s+([^\n]+,[^\n]+\d)", text, re.I)
+        m = RX_LOCATION_SVEDEA.search(text)
         if m:
             location = m.group(1).strip()
             return KPI(None, location, None, 1.0, Evidence(page, location))
     return kpi_none()
 
+RX_SJUKAVBROTT = kpi_pattern(
+    r"\b(Sjukavbrott|Sjukavbrottsförsäkring)\b", anchor=("sjukavbrott",), example="SJUKAVBROTTSFÖRSÄKRING")
+
 def find_sjukavbrott_exists(pages: List[Tuple[int, str]]) -> KPI:
     """
     Returnerar Ja/Nej som text (raw), och value=1/0.
     Söker efter "Sjukavbrott" eller "SJUKAVBROTTSFÖRSÄKRING"
     """
     for page, text in pages:
-        if re.search(r"\b(Sjukavbrott|Sjukavbrottsförsäkring)\b", text, re.I):
+        if RX_SJUKAVBROTT.search(text):
             # ta en kort evidensrad om möjligt
             lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-            evidence_line = next((ln for ln in lines if re.search(r"\b(Sjukavbrott|Sjukavbrottsförsäkring)\b", ln, re.I)), "Sjukavbrott (träff)")
+            evidence_line = next((ln for ln in lines if RX_SJUKAVBROTT.search(ln)), "Sjukavbrott (träff)")
             return KPI(
                 value=1.0,
                 raw="Ja",
@@ -333,7 +654,7 @@ def find_sjukavbrott_details(pages: List[Tuple[int, str]]) -> KPI:
     Returnerar som t.ex. "Lisa Taavo 1,9 MSEK"
     """
     for page, text in pages:
-        if re.search(r"\b(Sjukavbrott|Sjukavbrottsförsäkring)\b", text, re.I):
+        if RX_SJUKAVBROTT.search(text):
             lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
             
             # Hitta försäkrad (insured person name) - kan ha "-" prefix
@@ -391,43 +712,76 @@ def find_sjukavbrott_details(pages: List[Tuple[int, str]]) -> KPI:
 
 # -------------------- KPI extraction --------------------
 
-def extract_kpis(pdf_path: str) -> Dict[str, KPI]:
-    pages = read_pages(pdf_path)
-    company = detect_company(pages)
+def extract_kpis(source: PdfSource) -> Dict[str, KPI]:
+    kpis, _ = extract_kpis_with_triage(source)
+    return kpis
 
+def extract_kpis_with_triage(source: PdfSource) -> Tuple[Dict[str, KPI], List[SkippedPage]]:
+    """
+    Som extract_kpis, men returnerar även sidorna som triagen hoppade över
+    (tom lista om triage inte är påslagen, se PAGE_TRIAGE).
+    """
+    skipped: List[SkippedPage] = []
+    metrics.IN_PROGRESS.inc()
+    try:
+        start = time.perf_counter()
+        pages = read_pages(source, skipped=skipped)
+        company = detect_company(pages)
+        kpis = extract_kpis_from_pages(pages, company)
+        elapsed = time.perf_counter() - start
+    finally:
+        metrics.IN_PROGRESS.dec()
+
+    metrics.DOCUMENTS.inc(company=company)
+    metrics.EXTRACT_SECONDS.observe(elapsed, company=company)
+    for name, k in kpis.items():
+        metrics.KPI_LOOKUPS.inc(company=company, kpi=name)
+        # Standardvärden (t.ex. Svedeas 3 år protetik) räknas som ej hittade -
+        # ökar andelen är det troligen bolagets mall som har ändrats
+        if k.evidence is None or k.evidence.default:
+            metrics.KPI_NOT_FOUND.inc(company=company, kpi=name)
+
+    return kpis, skipped
+
+RX_DENTISTS = [
+    kpi_pattern(r"Antal\s+Tandläkare\s+(\d+)", anchor=("antal", "tandläkare"),
+                example="Antal Tandläkare 3"),  # PTL
+    kpi_pattern(r"Tandläkare\s*-\s*övrigt\s*([\d\s]+,\d+|\d+)\s*st", anchor=("tandläkare", "övrigt"),
+                example="Tandläkare - övrigt 3,00 st"),  # Svedea
+]
+RX_HYGIENISTS = [
+    kpi_pattern(r"Antal\s+Tandhygienister\s+(\d+)", anchor=("antal", "tandhygienister"),
+                example="Antal Tandhygienister 2"),  # PTL
+    # ev svedea-format kan läggas till senare
+]
+RX_SURGEONS = [
+    kpi_pattern(r"Antal\s+Käkkirurger\s+(\d+)", anchor=("antal", "käkkirurger"),
+                example="Antal Käkkirurger 1"),
+    kpi_pattern(r"Antal\s+Tandkirurger\s+(\d+)", anchor=("antal", "tandkirurger"),
+                example="Antal Tandkirurger 1"),
+    kpi_pattern(r"Käkkirurger\s*-\s*övrigt\s*([\d\s]+,\d+|\d+)\s*st", anchor=("käkkirurger", "övrigt"),
+                example="Käkkirurger - övrigt 1,00 st"),
+    kpi_pattern(r"Tandkirurger\s*-\s*övrigt\s*([\d\s]+,\d+|\d+)\s*st", anchor=("tandkirurger", "övrigt"),
+                example="Tandkirurger - övrigt 1,00 st"),
+]
+RX_INTERRUPTION = [
+    kpi_pattern(r"Avbrottsförsäkring\s+(\d+)\s*månader", anchor=("avbrottsförsäkring", "månader"),
+                example="Avbrottsförsäkring 12 månader"),  # PTL
+    kpi_pattern(r"Ansvarstid\s+(\d+)\s*månader", anchor=("ansvarstid", "månader"),
+                example="Ansvarstid 12 månader"),  # Svedea
+]
+
+def extract_kpis_from_pages(pages: List[Tuple[int, str]], company: str) -> Dict[str, KPI]:
     kpis: Dict[str, KPI] = {}
 
     # Antal tandläkare
-    kpis["Antal tandläkare"] = find_first(
-        pages,
-        [
-            re.compile(r"Antal\s+Tandläkare\s+(\d+)", re.I),  # PTL
-            re.compile(r"Tandläkare\s*-\s*övrigt\s*([\d\s]+,\d+|\d+)\s*st", re.I),  # Svedea
-        ],
-        unit="st"
-    )
+    kpis["Antal tandläkare"] = find_first(pages, RX_DENTISTS, unit="st")
 
     # Antal tandhygienister
-    kpis["Antal tandhygienister"] = find_first(
-        pages,
-        [
-            re.compile(r"Antal\s+Tandhygienister\s+(\d+)", re.I),  # PTL
-            # ev svedea-format kan läggas till senare
-        ],
-        unit="st"
-    )
+    kpis["Antal tandhygienister"] = find_first(pages, RX_HYGIENISTS, unit="st")
 
     # Antal tandkirurgi/käkkirurger
-    kpis["Antal tandkirurgi/käkkirurger"] = find_first(
-        pages,
-        [
-            re.compile(r"Antal\s+Käkkirurger\s+(\d+)", re.I),
-            re.compile(r"Antal\s+Tandkirurger\s+(\d+)", re.I),
-            re.compile(r"Käkkirurger\s*-\s*övrigt\s*([\d\s]+,\d+|\d+)\s*st", re.I),
-            re.compile(r"Tandkirurger\s*-\s*övrigt\s*([\d\s]+,\d+|\d+)\s*st", re.I),
-        ],
-        unit="st"
-    )
+    kpis["Antal tandkirurgi/käkkirurger"] = find_first(pages, RX_SURGEONS, unit="st")
 
     # Omsättning (normaliserad)
     if company == "Svedea":
@@ -437,14 +791,7 @@ def extract_kpis(pdf_path: str) -> Dict[str, KPI]:
         kpis["Omsättning"] = find_ptl_turnover_sek(pages)
 
     # Avbrottstid
-    kpis["Avbrottstid"] = find_first(
-        pages,
-        [
-            re.compile(r"Avbrottsförsäkring\s+(\d+)\s*månader", re.I),  # PTL
-            re.compile(r"Ansvarstid\s+(\d+)\s*månader", re.I),          # Svedea
-        ],
-        unit="månader"
-    )
+    kpis["Avbrottstid"] = find_first(pages, RX_INTERRUPTION, unit="månader")
 
     # Protetik - garantitid (år)
     if company == "Svedea":
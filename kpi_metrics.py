@@ -0,0 +1,345 @@
+# kpi_metrics.py
+# ------------------------------------------------------------
+# Enkla processlokala mätvärden i Prometheus textformat:
+# - Counter / Gauge / Histogram med etiketter (labels)
+# - Exponering via lokal HTTP-endpoint (/metrics) eller fil som
+#   skrivs om periodiskt (t.ex. för node_exporters textfile-collector)
+# - Start via miljövariabler: KPI_METRICS_PORT, KPI_METRICS_FILE,
+#   KPI_METRICS_INTERVAL
+# ------------------------------------------------------------
+
+import abc
+import logging
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Sequence, Tuple
+
+
+log = logging.getLogger(__name__)
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Sekunder - en PDF tar typiskt 0,1-5 s att läsa
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# -------------------- Metric types --------------------
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: förväntade labels {self.labelnames}, fick {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        ...
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        # Utan labels finns bara en serie - visa den (0) redan från start
+        if not self.labelnames:
+            self._values[()] = 0.0
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError(f"{self.name}: en counter kan inte minska")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        if not self.labelnames:
+            self._values[()] = 0.0
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # key -> (antal per bucket (ej kumulativt), summa)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+        if not self.labelnames:
+            self._values[()] = ([0] * len(self.buckets), 0.0)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = f'le="{_fmt_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _fmt_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# -------------------- Registry --------------------
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric finns redan: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, doc, labelnames))
+
+    def gauge(self, name: str, doc: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, doc, labelnames))
+
+    def histogram(self, name: str, doc: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, doc, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# -------------------- Exposure --------------------
+
+_started: Dict[str, object] = {}
+_start_lock = threading.Lock()
+
+def start_http_server(port: int, addr: str = "127.0.0.1",
+                      registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """
+    Startar en lokal /metrics-endpoint i en daemon-tråd.
+    Idempotent per port - Streamlit kör om skriptet vid varje interaktion.
+    """
+    key = f"http:{addr}:{port}"
+    with _start_lock:
+        if key in _started:
+            return _started[key]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((addr, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="kpi-metrics-http", daemon=True).start()
+        _started[key] = server
+        return server
+
+def write_metrics_file(path: str, registry: Registry = REGISTRY) -> None:
+    # Skriv till temporär fil + byt namn så att läsare aldrig ser en halv fil
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(tmp, path)
+
+def start_file_writer(path: str, interval: float = 15.0,
+                      registry: Registry = REGISTRY) -> threading.Thread:
+    """
+    Skriver om `path` var `interval`:e sekund i en daemon-tråd.
+    Idempotent per sökväg.
+    """
+    key = f"file:{os.path.abspath(path)}"
+    with _start_lock:
+        if key in _started:
+            return _started[key]
+
+        def loop():
+            while True:
+                try:
+                    write_metrics_file(path, registry)
+                except OSError:
+                    pass
+                time.sleep(interval)
+
+        thread = threading.Thread(target=loop, name="kpi-metrics-file", daemon=True)
+        thread.start()
+        _started[key] = thread
+        return thread
+
+_env_started = False
+
+def start_from_env() -> None:
+    """
+    KPI_METRICS_PORT=9464           -> http://127.0.0.1:9464/metrics
+    KPI_METRICS_ADDR=0.0.0.0        -> lyssna på annan adress (valfritt)
+    KPI_METRICS_FILE=/path/kpi.prom -> skriv fil var KPI_METRICS_INTERVAL s (default 15)
+
+    Görs bara en gång per process. Fel (t.ex. upptagen port) loggas - mätvärden
+    får aldrig hindra appen från att starta.
+    """
+    global _env_started
+    with _start_lock:
+        if _env_started:
+            return
+        _env_started = True
+
+    port = os.environ.get("KPI_METRICS_PORT")
+    if port:
+        addr = os.environ.get("KPI_METRICS_ADDR", "127.0.0.1")
+        try:
+            start_http_server(int(port), addr)
+        except (OSError, ValueError) as exc:
+            log.warning("Kunde inte starta metrics-endpoint på %s:%s: %s", addr, port, exc)
+    path = os.environ.get("KPI_METRICS_FILE")
+    if path:
+        try:
+            start_file_writer(path, float(os.environ.get("KPI_METRICS_INTERVAL", "15")))
+        except ValueError as exc:
+            log.warning("Ogiltigt KPI_METRICS_INTERVAL: %s", exc)
+
+
+# -------------------- KPI metrics --------------------
+
+DOCUMENTS = REGISTRY.counter(
+    "kpi_documents_total",
+    "Antal extraherade dokument per bolag (enligt detect_company).",
+    ["company"],
+)
+READ_PAGES_SECONDS = REGISTRY.histogram(
+    "kpi_read_pages_seconds",
+    "Tid för read_pages (PDF-parsning + textextraktion) per dokument.",
+)
+EXTRACT_SECONDS = REGISTRY.histogram(
+    "kpi_extract_seconds",
+    "Tid för extract_kpis per dokument.",
+    ["company"],
+)
+PAGES_READ = REGISTRY.counter(
+    "kpi_pages_read_total",
+    "Antal PDF-sidor som lästs med extract_text().",
+)
+PAGES_SKIPPED = REGISTRY.counter(
+    "kpi_pages_skipped_total",
+    "Antal sidor som sidtriagen hoppade över, per skäl.",
+    ["reason"],
+)
+KPI_LOOKUPS = REGISTRY.counter(
+    "kpi_lookups_total",
+    "Antal KPI-uppslag per bolag och KPI.",
+    ["company", "kpi"],
+)
+KPI_NOT_FOUND = REGISTRY.counter(
+    "kpi_not_found_total",
+    "Antal KPI-uppslag utan träff (ingen evidens eller standardvärde) per bolag och KPI.",
+    ["company", "kpi"],
+)
+IN_PROGRESS = REGISTRY.gauge(
+    "kpi_extractions_in_progress",
+    "Antal extraktioner som pågår just nu.",
+)
+WORKER_QUEUE_DEPTH = REGISTRY.gauge(
+    "kpi_worker_queue_depth",
+    "Antal extraktionsjobb som väntar i arbetspoolens kö.",
+)
+WORKER_ACTIVE = REGISTRY.gauge(
+    "kpi_worker_active",
+    "Antal arbetstrådar som kör en extraktion just nu.",
+)
+WORKER_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "kpi_worker_queue_wait_seconds",
+    "Tid ett extraktionsjobb väntar i kön innan det börjar köras.",
+)
@@ -0,0 +1,135 @@
+# kpi_pool.py
+# ------------------------------------------------------------
+# Processgemensam arbetspool för PDF-extraktion:
+# - fast antal förstartade arbetstrådar = tak för samtidiga extraktioner
+# - en gemensam FIFO-kö för alla Streamlit-sessioner
+# - köplats per jobb så att appen kan visa den för användaren
+# - storlek via KPI_MAX_CONCURRENCY (default 1)
+# ------------------------------------------------------------
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Optional, Tuple
+
+import kpi_metrics as metrics
+
+
+log = logging.getLogger(__name__)
+
+# pdfplumber är ren Python och håller GIL:en - en andra tråd delar bara
+# samma kärna och gör varje jobb långsammare (sämre svarstid i svansen).
+DEFAULT_CONCURRENCY = 1
+
+
+class WorkerPool:
+    def __init__(self, workers: int = DEFAULT_CONCURRENCY):
+        if workers < 1:
+            raise ValueError(f"workers måste vara minst 1, fick {workers}")
+        self.workers = workers
+        self._cond = threading.Condition()
+        # (future, fn, args, tidpunkt då jobbet köades)
+        self._queue: Deque[Tuple[Future, Callable[..., Any], tuple, float]] = deque()
+        self._active = 0
+
+        # Starta alla trådar direkt så att första användaren inte betalar för det
+        for i in range(workers):
+            threading.Thread(target=self._run, name=f"kpi-worker-{i + 1}", daemon=True).start()
+        self._update_gauges()
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """
+        Lägger jobbet sist i kön och returnerar en Future.
+        Future.cancel() tar bort jobbet om det inte har börjat köras.
+        """
+        fut: Future = Future()
+        with self._cond:
+            self._queue.append((fut, fn, args, time.perf_counter()))
+            self._update_gauges()
+            self._cond.notify()
+        fut.add_done_callback(self._discard)
+        return fut
+
+    def _discard(self, fut: Future) -> None:
+        # Avbrutna jobb ska inte ta köplats från andra sessioner
+        if not fut.cancelled():
+            return
+        with self._cond:
+            for entry in self._queue:
+                if entry[0] is fut:
+                    self._queue.remove(entry)
+                    break
+            self._update_gauges()
+
+    def position(self, fut: Future) -> int:
+        """
+        Köplats för ett jobb: 1 = nästa på tur, 0 = körs redan eller är klart.
+        """
+        with self._cond:
+            for i, (queued, _, _, _) in enumerate(self._queue):
+                if queued is fut:
+                    return i + 1
+        return 0
+
+    def _update_gauges(self) -> None:
+        # Anropas med self._cond låst
+        metrics.WORKER_QUEUE_DEPTH.set(len(self._queue))
+        metrics.WORKER_ACTIVE.set(self._active)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                fut, fn, args, queued_at = self._queue.popleft()
+                running = fut.set_running_or_notify_cancel()
+                if running:
+                    self._active += 1
+                self._update_gauges()
+            if not running:
+                continue
+
+            metrics.WORKER_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - queued_at)
+            try:
+                fut.set_result(fn(*args))
+            except BaseException as exc:
+                fut.set_exception(exc)
+            finally:
+                with self._cond:
+                    self._active -= 1
+                    self._update_gauges()
+
+
+_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+def _concurrency_from_env() -> int:
+    """
+    KPI_MAX_CONCURRENCY som heltal >= 1. Ogiltigt värde loggas och ger
+    DEFAULT_CONCURRENCY - en felaktig miljövariabel får inte stoppa appen.
+    """
+    value = os.environ.get("KPI_MAX_CONCURRENCY")
+    if value is None:
+        return DEFAULT_CONCURRENCY
+    try:
+        workers = int(value)
+        if workers < 1:
+            raise ValueError(f"måste vara minst 1, fick {workers}")
+    except ValueError as exc:
+        log.warning("Ogiltigt KPI_MAX_CONCURRENCY=%r (%s), använder %d", value, exc, DEFAULT_CONCURRENCY)
+        return DEFAULT_CONCURRENCY
+    return workers
+
+def get_pool() -> WorkerPool:
+    """
+    Den gemensamma poolen för processen (skapas vid första anropet).
+    Streamlit kör om app.py per interaktion men moduler laddas bara en gång.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(_concurrency_from_env())
+        return _pool